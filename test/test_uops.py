@@ -351,6 +351,25 @@ class TestAssembly(unittest.TestCase):
     self.assertEqual(uops[-1].op, Ops.SHR)
     self.assertEqual(uops[-2].op, Ops.IDIV)
 
+class TestPTXRender(unittest.TestCase):
+  def test_gated_load_selp(self):
+    from tinygrad.renderer.ptx import PTXRenderer
+    renderer = PTXRenderer("sm_80")
+    g0, g1 = UOp(Ops.DEFINE_GLOBAL, dtypes.int32.ptr(), (), 0), UOp(Ops.DEFINE_GLOBAL, dtypes.int32.ptr(), (), 1)
+    lidx0 = UOp(Ops.SPECIAL, dtypes.int, (), ('lidx0', 4))
+    ld = UOp(Ops.LOAD, dtypes.int, (g1.index(lidx0, lidx0 < 2),))
+    src = [l.split() for l in renderer.render("test", to_uops_list([UOp.store(g0.index(lidx0), ld)], opts=renderer)).split("\n")]
+    lds = [i for i,l in enumerate(src) if any(x.startswith("ld.global") for x in l)]
+    self.assertEqual(len(lds), 1)
+    # the gated load goes into its own register, selp then picks between it and the alt (0) on the same gate
+    gld, selp = src[lds[0]], [x.rstrip(",;") for x in src[lds[0]+1]]
+    self.assertTrue(gld[0].startswith("@"))
+    self.assertEqual(selp[0], "selp.b32")
+    self.assertEqual(selp[2], gld[2].rstrip(","))
+    self.assertEqual(selp[4], gld[0][1:])
+    self.assertIn([f"{selp[3]},", "0;"], [l[1:] for l in src if l and l[0] == "mov.b32"])
+    self.assertFalse(any(l and l[0].startswith("@!") for l in src))
+
 class TestUOpMethod(unittest.TestCase):
   @unittest.skip("uops lt no longer ordered")
   def test_compare_alu_same_src_different_arg(self):
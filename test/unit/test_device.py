@@ -3,7 +3,7 @@ import unittest
 from unittest.mock import patch
 import os
 from tinygrad import Tensor
-from tinygrad.device import Device, Compiler
+from tinygrad.device import Device, Compiler, LRUAllocator, BufferOptions
 from tinygrad.helpers import diskcache_get, diskcache_put, getenv
 
 class TestDevice(unittest.TestCase):
@@ -50,5 +50,40 @@ class TestCompiler(unittest.TestCase):
       a = Tensor([0.,1.], device=Device.DEFAULT).realize()
       (a + 1).realize()
 
+class MockLRUAllocator(LRUAllocator):
+  def __init__(self):
+    self.allocated, self.freed = [], []
+    super().__init__()
+  def _alloc(self, size, options):
+    self.allocated.append(ret:=object())
+    return ret
+  def _free(self, opaque, options): self.freed.append(opaque)
+
+class TestLRUAllocator(unittest.TestCase):
+  def test_hit(self):
+    alloc = MockLRUAllocator()
+    alloc.free(buf:=alloc.alloc(16), 16)
+    self.assertIs(alloc.alloc(16), buf)
+    self.assertEqual(len(alloc.allocated), 1)
+    self.assertEqual(alloc.freed, [])
+
+  def test_miss(self):
+    alloc = MockLRUAllocator()
+    alloc.free(buf:=alloc.alloc(16), 16)
+    # a different size or different options don't reuse the cached buffer, and the miss leaves no entry behind
+    self.assertIsNot(alloc.alloc(32), buf)
+    self.assertIsNot(alloc.alloc(16, BufferOptions(host=True)), buf)
+    self.assertEqual(len(alloc.allocated), 3)
+    self.assertEqual(list(alloc.cache.keys()), [(16, None)])
+
+  def test_free_cache(self):
+    alloc = MockLRUAllocator()
+    bufs = [alloc.alloc(16), alloc.alloc(16), alloc.alloc(32)]
+    for b,sz in zip(bufs, [16, 16, 32]): alloc.free(b, sz)
+    alloc.free_cache()
+    self.assertEqual(sorted(map(id, alloc.freed)), sorted(map(id, bufs)))
+    self.assertEqual(len(alloc.cache), 0)
+    self.assertIsNot(alloc.alloc(16), bufs[0])
+
 if __name__ == "__main__":
   unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+from tinygrad.device import Buffer, Device
+from tinygrad.dtype import dtypes
+from tinygrad.engine.jit import GraphRunner
+from tinygrad.engine.realize import ExecItem, BufferCopy
+
+class TestAccessResources(unittest.TestCase):
+  def setUp(self):
+    self.a, self.b = [Buffer(Device.DEFAULT, 4, dtypes.int).ensure_allocated() for _ in range(2)]
+    self.graph = GraphRunner([ExecItem(BufferCopy(16, Device.DEFAULT, Device.DEFAULT), [self.a, self.b])], [], {})
+    self.n1, self.n2, self.n3, self.n4 = object(), object(), object(), object()
+
+  def test_duplicate_reads_wait_once(self):
+    self.assertEqual(self.graph._access_resources([self.a], [0], self.n1), [])
+    self.assertEqual(self.graph._access_resources([self.b], [0], self.n2), [])
+    # a is read twice, its writer is only waited on once and the order the buffers came in is kept
+    self.assertEqual(self.graph._access_resources([self.b, self.a, self.a], [], self.n3), [self.n2, self.n1])
+
+  def test_write_after_duplicate_reads(self):
+    self.graph._access_resources([self.a], [0], self.n1)
+    self.graph._access_resources([self.b], [0], self.n2)
+    self.graph._access_resources([self.a, self.b, self.a], [], self.n3)
+    # n3 read both buffers (a twice), a write to both waits on each writer and on n3 once
+    self.assertEqual(self.graph._access_resources([self.a, self.b], [0, 1], self.n4), [self.n1, self.n3, self.n2])
+
+if __name__ == '__main__':
+  unittest.main()
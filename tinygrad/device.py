@@ -151,7 +151,8 @@ class LRUAllocator(Allocator):  # pylint: disable=abstract-method
   """
   def __init__(self): self.cache: Dict[Tuple[int, Optional[BufferOptions]], Any] = defaultdict(list)
   def alloc(self, size:int, options:Optional[BufferOptions]=None):
-    if len(c := self.cache[(size, options)]): return c.pop()
+    # NOTE: get doesn't insert, a miss on a new (size, options) leaves no empty list behind in the cache
+    if c := self.cache.get((size, options)): return c.pop()
     try: return super().alloc(size, options)
     except (RuntimeError, MemoryError):
       self.free_cache()
@@ -159,7 +160,7 @@ class LRUAllocator(Allocator):  # pylint: disable=abstract-method
   def free_cache(self):
     for (sz,options),opaques in self.cache.items():
       for opaque in opaques: super().free(opaque, sz, options)
-      opaques.clear()
+    self.cache.clear()
   def free(self, opaque:Any, size:int, options:Optional[BufferOptions]=None):
     if getenv("LRU", 1) and (options is None or not options.nolru): self.cache[(size, options)].append(opaque)
     else: super().free(opaque, size, options)
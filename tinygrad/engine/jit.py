@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import TypeVar, Generic, Callable, List, Tuple, Union, Dict, cast, Optional, Any
+from typing import TypeVar, Generic, Callable, List, Tuple, Union, Dict, Set, cast, Optional, Any
 import functools, collections
 from tinygrad.tensor import Tensor
 from tinygrad.engine.lazy import LazyBuffer
@@ -83,6 +83,7 @@ class GraphRunner(Runner):  # pylint: disable=abstract-method
     def is_sym_dim(dim) -> bool: return not all(isinstance(d, (int, float)) for d in dim)
 
     self.vars = sorted(var_vals.keys(), key=lambda v: v.expr)
+    var_idx = {v:i for i,v in enumerate(self.vars)}
     self.symbolic_dims = dedup([tuple(d) for ji in jit_cache if isinstance(ji.prg, CompiledRunner) and (d:=ji.prg.p.local_size) and is_sym_dim(d)] +
                                [tuple(d) for ji in jit_cache if isinstance(ji.prg, CompiledRunner) and (d:=ji.prg.p.global_size) and is_sym_dim(d)])
     def find_symbolic_dim(dim): return self.symbolic_dims.index(tuple(dim)) if dim is not None and tuple(dim) in self.symbolic_dims else None
@@ -92,7 +93,7 @@ class GraphRunner(Runner):  # pylint: disable=abstract-method
       mem_estimate += ji.prg.mem_estimate
       lds_estimate += ji.prg.lds_estimate
       if isinstance(ji.prg, CompiledRunner):
-        if ji.prg.p.vars: self.var_vals_replace[j] = [self.vars.index(v) for v in ji.prg.p.vars]
+        if ji.prg.p.vars: self.var_vals_replace[j] = [var_idx[v] for v in ji.prg.p.vars]
 
         global_dim_idx, local_dim_idx = find_symbolic_dim(ji.prg.p.global_size), find_symbolic_dim(ji.prg.p.local_size)
         if global_dim_idx is not None or local_dim_idx is not None: self.launch_dims_replace[j] = (global_dim_idx, local_dim_idx)
@@ -116,16 +117,24 @@ class GraphRunner(Runner):  # pylint: disable=abstract-method
   def _access_resources(self, rawbufs:List[Buffer], write:List[int], new_dependency:Any):
     # To synchronize access to resources, we monitor the necessary prerequisites for accessing each resource,
     # whether for write or read operations. A resource can be accessed by either a single writer or multiple readers.
-    wait_nodes = []
+    # NOTE: duplicates are skipped as they are found, so no dedup pass is needed on the result
+    wait_nodes: List[Any] = []
+    seen: Set[int] = set()
+    def wait(node):
+      if id(node) not in seen:
+        seen.add(id(node))
+        wait_nodes.append(node)
 
     for i,rawbuf in enumerate(rawbufs):
-      if id(rawbuf.base._buf) in self.w_dependency_map: wait_nodes.append(self.w_dependency_map[id(rawbuf.base._buf)])
+      key = id(rawbuf.base._buf)
+      if key in self.w_dependency_map: wait(self.w_dependency_map[key])
       if i in write:
-        if id(rawbuf.base._buf) in self.r_dependency_map: wait_nodes.extend(self.r_dependency_map.pop(id(rawbuf.base._buf)))
-        self.w_dependency_map[id(rawbuf.base._buf)] = new_dependency
-      else: self.r_dependency_map[id(rawbuf.base._buf)].append(new_dependency)
+        if key in self.r_dependency_map:
+          for node in self.r_dependency_map.pop(key): wait(node)
+        self.w_dependency_map[key] = new_dependency
+      else: self.r_dependency_map[key].append(new_dependency)
 
-    return list({id(x):x for x in wait_nodes}.values())
+    return wait_nodes
 
 # a marker for your graph supporting multiple devices of the same type
 class MultiGraphRunner(GraphRunner): pass # pylint: disable=abstract-method
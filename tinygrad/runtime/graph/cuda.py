@@ -1,7 +1,7 @@
 import ctypes
-from typing import Any, Optional, Tuple, Dict, List, cast
+from typing import Any, Optional, Tuple, Dict, List, Set, cast
 import tinygrad.runtime.autogen.cuda as cuda
-from tinygrad.helpers import init_c_var, dedup
+from tinygrad.helpers import init_c_var
 from tinygrad.device import Buffer, Device
 from tinygrad.runtime.ops_cuda import CUDADevice, check, encode_args, cu_time_execution
 from tinygrad.ops import Variable
@@ -12,10 +12,7 @@ class CUDAGraph(MultiGraphRunner):
   def __init__(self, jit_cache: List[ExecItem], input_rawbuffers: List[Buffer], var_vals: Dict[Variable, int]):
     super().__init__(jit_cache, input_rawbuffers, var_vals)
 
-    # Check all jit items are compatible.
-    if not all(isinstance(ji.prg, (CompiledRunner, BufferXfer)) for ji in jit_cache): raise GraphException
-
-    self.jc_idx_with_updatable_rawbufs = dedup([x[0] for x in self.input_replace.keys()])
+    self.jc_idx_with_updatable_rawbufs = {x[0] for x in self.input_replace.keys()}
     self.updatable_nodes: Dict[int, Tuple[Any, Any, Any, bool]] = {} # Dict[jc index] = tuple(graph node, node params, input kernel params, is memcpy)
 
     self.graph = init_c_var(cuda.CUgraph(), lambda x: check(cuda.cuGraphCreate(ctypes.byref(x), 0)))
@@ -45,28 +42,39 @@ class CUDAGraph(MultiGraphRunner):
                                           WidthInBytes=dest.nbytes, Height=1, Depth=1)
         check(cuda.cuGraphAddMemcpyNode(ctypes.byref(node_from), self.graph, c_deps, len(deps), ctypes.byref(cp_params), src_dev.context))
         if j in self.jc_idx_with_updatable_rawbufs: self.updatable_nodes[j] = (node_from, cp_params, src_dev.context, True)
+      # NOTE: compatibility is checked while building, __del__ frees the partial graph
+      else: raise GraphException
 
     self.instance = init_c_var(cuda.CUgraphExec(), lambda x: check(cuda.cuGraphInstantiate_v2(ctypes.byref(x), self.graph, None, None, 0)))
 
   def __call__(self, input_rawbuffers: List[Buffer], var_vals: Dict[Variable, int], wait=False) -> Optional[float]:
+    # NOTE: the exec graph keeps a copy of the params it was last given, so only nodes whose structs actually changed are pushed to it
+    dirty: Set[int] = set()
+    def update(st, field:str, val:int, j:int):
+      if getattr(st, field) != val:
+        setattr(st, field, val)
+        dirty.add(j)
+
     # Update rawbuffers in the c_args struct.
     for (j,i),input_idx in self.input_replace.items():
-      if not self.updatable_nodes[j][3]: setattr(self.updatable_nodes[j][2], f'f{i}', input_rawbuffers[input_idx]._buf)
+      if not self.updatable_nodes[j][3]: update(self.updatable_nodes[j][2], f'f{i}', input_rawbuffers[input_idx]._buf.value, j)
       else:
-        if i == 0: self.updatable_nodes[j][1].destDevice = input_rawbuffers[input_idx]._buf
-        elif i == 1: self.updatable_nodes[j][1].srcDevice = input_rawbuffers[input_idx]._buf
+        if i == 0: update(self.updatable_nodes[j][1], 'destDevice', input_rawbuffers[input_idx]._buf.value, j)
+        elif i == 1: update(self.updatable_nodes[j][1], 'srcDevice', input_rawbuffers[input_idx]._buf.value, j)
 
     # Update var_vals in the c_args struct.
-    for j, i, v in self.updated_vars(var_vals): setattr(self.updatable_nodes[j][2], f'v{i}', v)
+    for j, i, v in self.updated_vars(var_vals): update(self.updatable_nodes[j][2], f'v{i}', v, j)
 
     # Update launch dims in the kern_params struct.
     for j, global_dims, local_dims in self.updated_launch_dims(var_vals):
       prg = cast(CompiledRunner, self.jit_cache[j].prg)
       node, global_size, local_size = self.updatable_nodes[j][1], global_dims or prg.p.global_size, local_dims or prg.p.local_size
       node.blockDimX, node.blockDimY, node.blockDimZ, node.gridDimX, node.gridDimY, node.gridDimZ = *local_size, *global_size # type: ignore[misc]
+      dirty.add(j)
 
     # Update graph nodes with the updated structs.
-    for node, c_node_params, c_args, is_copy in self.updatable_nodes.values():
+    for j in dirty:
+      node, c_node_params, c_args, is_copy = self.updatable_nodes[j]
       if not is_copy: check(cuda.cuGraphExecKernelNodeSetParams(self.instance, node, ctypes.byref(c_node_params)))
       else: check(cuda.cuGraphExecMemcpyNodeSetParams(self.instance, node, ctypes.byref(c_node_params), c_args))
 
@@ -1,5 +1,5 @@
-from typing import List, Any, Dict, cast, Optional
-import ctypes
+from typing import List, Any, Dict, Tuple, cast, Optional
+import ctypes, array
 from tinygrad.dtype import dtypes
 from tinygrad.helpers import dedup, getenv
 from tinygrad.device import Buffer
@@ -37,16 +37,19 @@ class MetalGraph(GraphRunner):
     if len(self.vars): self.int_buf = self.device.allocator.alloc(len(self.vars)*dtypes.int32.itemsize)
     all_resources = [self.int_buf.buf] if len(self.vars) else []
     all_pipelines = []
+    # NOTE: the icb owns its commands, the handles are resolved once here and reused by every __call__
+    self.icb_commands: List[objc_id] = []
+    var_offset = {v:i*4 for i,v in enumerate(self.vars)}
     for j,ji in enumerate(self.jit_cache):
       prg: CompiledRunner = cast(CompiledRunner, ji.prg)
-      icb_command = msg(self.icb, "indirectComputeCommandAtIndex:", j, restype=objc_instance)
+      self.icb_commands.append(icb_command:=msg(self.icb, "indirectComputeCommandAtIndex:", j, restype=objc_id))
       all_pipelines.append(prg.clprg.pipeline_state)
       msg(icb_command, "setComputePipelineState:", prg.clprg.pipeline_state)
       for i,b in enumerate(ji.bufs):
         if b is not None and b not in input_rawbuffers:
           msg(icb_command, "setKernelBuffer:offset:atIndex:", b._buf.buf, b._buf.offset, i)
           all_resources.append(b._buf.buf)
-      for i,v in enumerate(prg.p.vars): msg(icb_command, "setKernelBuffer:offset:atIndex:", self.int_buf.buf, self.vars.index(v)*4, len(ji.bufs)+i)
+      for i,v in enumerate(prg.p.vars): msg(icb_command, "setKernelBuffer:offset:atIndex:", self.int_buf.buf, var_offset[v], len(ji.bufs)+i)
 
       global_size, local_size = prg.p.launch_dims(var_vals)
       msg(icb_command, "concurrentDispatchThreadgroups:threadsPerThreadgroup:", to_struct(*global_size), to_struct(*local_size))
@@ -57,28 +60,31 @@ class MetalGraph(GraphRunner):
     self.command_buffer: Any = None
     if len(self.vars): self.int_buf_view = self.device.allocator.as_buffer(self.int_buf).cast('i')
     self.range = to_struct(0, len(self.jit_cache))
+    self.empty_dims = to_struct(0, 0, 0)
+    self.input_bufs: Optional[Tuple[objc_id, ...]] = None
 
   def __call__(self, input_rawbuffers: List[Buffer], var_vals: Dict[Variable, int], wait=False) -> Optional[float]:
 
     if self.command_buffer is not None and self.command_buffer in self.device.mtl_buffers_in_flight: wait_check(self.command_buffer)
-    all_resources = dedup(self.all_resources + [x._buf.buf for x in input_rawbuffers])
+    # NOTE: the resources array only changes when the input buffers do, replaying with the same inputs reuses it
+    if (input_bufs:=tuple(x._buf.buf for x in input_rawbuffers)) != self.input_bufs:
+      all_resources = dedup(self.all_resources + list(input_bufs))
+      self.input_bufs, self.resources = input_bufs, (objc_id * len(all_resources))(*all_resources)
 
     for (j,i),input_idx in self.input_replace.items():
-      computeCommand = msg(self.icb, "indirectComputeCommandAtIndex:", j, restype=objc_id)
-      msg(computeCommand, "setKernelBuffer:offset:atIndex:", input_rawbuffers[input_idx]._buf.buf,
-                                                                                 input_rawbuffers[input_idx]._buf.offset, i)
+      msg(self.icb_commands[j], "setKernelBuffer:offset:atIndex:", input_rawbuffers[input_idx]._buf.buf,
+                                                                                   input_rawbuffers[input_idx]._buf.offset, i)
 
     for j, global_dims, local_dims in self.updated_launch_dims(var_vals):
       prg = cast(CompiledRunner, self.jit_cache[j].prg)
       global_size, local_size = global_dims or prg.p.global_size, local_dims or prg.p.local_size
-      computeCommand = msg(self.icb, "indirectComputeCommandAtIndex:", j)
-      msg(computeCommand, "concurrentDispatchThreadgroups:threadsPerThreadgroup:",
+      msg(self.icb_commands[j], "concurrentDispatchThreadgroups:threadsPerThreadgroup:",
                   to_struct(*cast(tuple, global_size)), to_struct(*cast(tuple, local_size)))
-    for j, var in enumerate(self.vars): self.int_buf_view[j] = var_vals[var]
+    if len(self.vars): self.int_buf_view[:] = array.array('i', [var_vals[var] for var in self.vars])
 
     command_buffer = msg(self.device.mtl_queue, "commandBuffer", restype=objc_instance)
     encoder = msg(command_buffer, "computeCommandEncoder", restype=objc_instance)
-    msg(encoder, "useResources:count:usage:", (objc_id * len(all_resources))(*all_resources), len(all_resources),
+    msg(encoder, "useResources:count:usage:", self.resources, len(self.resources),
         MTLResourceUsage.MTLResourceUsageRead | MTLResourceUsage.MTLResourceUsageWrite)
 
     # NOTE: the pipelines likely need to be added to the used resources to fix the crash on M1/M2, but I haven't figured out how
@@ -89,7 +95,7 @@ class MetalGraph(GraphRunner):
     if getenv("FIX_METAL_ICB", self.needs_icb_fix):
       for ps in self.all_pipelines:
         msg(encoder, "setComputePipelineState:", ps)
-        msg(encoder, "dispatchThreadgroups:threadsPerThreadgroup:", to_struct(0,0,0), to_struct(0,0,0))
+        msg(encoder, "dispatchThreadgroups:threadsPerThreadgroup:", self.empty_dims, self.empty_dims)
 
     msg(encoder, "executeCommandsInBuffer:withRange:", self.icb, self.range)
     msg(encoder, "endEncoding")
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import ctypes, ctypes.util, functools
-from typing import Tuple, Optional, List
+from typing import Tuple, Optional, List, Dict, Any
 from tinygrad.helpers import DEBUG, getenv, from_mv, init_c_var, init_c_struct_t
 from tinygrad.device import Compiled, BufferOptions, LRUAllocator
 from tinygrad.renderer.cstyle import CUDARenderer
@@ -19,15 +19,19 @@ def encode_args(args, vals) -> Tuple[ctypes.Structure, ctypes.Array]:
                                 ctypes.cast(ctypes.pointer(ctypes.c_size_t(ctypes.sizeof(c_args))), ctypes.c_void_p), ctypes.c_void_p(0))
   return c_args, vargs
 
+# NOTE: events belong to a context, the pair for the current one is created on the first timed launch and reused until the device goes away
+timing_events: Dict[int, List[Any]] = {}
 def cu_time_execution(cb, enable=False) -> Optional[float]:
   if not enable: return cb()
-  evs = [init_c_var(cuda.CUevent(), lambda x: cuda.cuEventCreate(ctypes.byref(x), 0)) for _ in range(2)]
+  check(cuda.cuCtxGetCurrent(ctypes.byref(ctx := cuda.CUcontext())))
+  if (key := ctypes.cast(ctx, ctypes.c_void_p).value) is None: raise RuntimeError("no current CUDA context to time the launch on")
+  if (evs := timing_events.get(key)) is None:
+    evs = timing_events[key] = [init_c_var(cuda.CUevent(), lambda x: check(cuda.cuEventCreate(ctypes.byref(x), 0))) for _ in range(2)]
   cuda.cuEventRecord(evs[0], None)
   cb()
   cuda.cuEventRecord(evs[1], None)
   check(cuda.cuEventSynchronize(evs[1]))
   cuda.cuEventElapsedTime(ctypes.byref(ret := ctypes.c_float()), evs[0], evs[1])
-  for ev in evs: cuda.cuEventDestroy_v2(ev)
   return ret.value * 1e-3
 
 class CUDAProgram:
@@ -117,6 +121,10 @@ class CUDADevice(Compiled):
     super().__init__(device, CUDAAllocator(self), PTXRenderer(self.arch) if PTX else CUDARenderer(self.arch),
                      PTXCompiler(self.arch) if PTX else CUDACompiler(self.arch), functools.partial(CUDAProgram, self), graph=CUDAGraph)
 
+  def __del__(self):
+    if hasattr(self, 'context') and (key:=ctypes.cast(self.context, ctypes.c_void_p).value) is not None:
+      for ev in timing_events.pop(key, []): cuda.cuEventDestroy_v2(ev)
+
   def synchronize(self):
     check(cuda.cuCtxSetCurrent(self.context))
     check(cuda.cuCtxSynchronize())
@@ -13,7 +13,7 @@ class DiskBuffer:
   def __repr__(self): return f"<DiskBuffer size={self.size} offset={self.offset}>"
   def _buf(self) -> memoryview:
     assert self.device.mem is not None, "DiskBuffer wasn't opened"
-    return memoryview(self.device.mem)[self.offset:self.offset+self.size]
+    return self.device.mem_view[self.offset:self.offset+self.size]
 
 MAP_LOCKED, MAP_POPULATE = 0 if OSX else 0x2000, getattr(mmap, "MAP_POPULATE", 0 if OSX else 0x008000)
 class DiskAllocator(Allocator):
@@ -26,10 +26,12 @@ class DiskAllocator(Allocator):
   def copyin(self, dest:DiskBuffer, src:memoryview): dest._buf()[:] = src
   def copyout(self, dest:memoryview, src:DiskBuffer):
     if OSX and self.device.fd is not None:
-      # OSX doesn't seem great at mmap, this is faster
-      with io.FileIO(self.device.fd, "a+b", closefd=False) as fo:
-        fo.seek(src.offset)
-        fo.readinto(dest)
+      # OSX doesn't seem great at mmap, this is faster. pread is one syscall and doesn't move the shared file offset
+      if hasattr(os, "preadv"): os.preadv(self.device.fd, [dest], src.offset)
+      else:
+        with io.FileIO(self.device.fd, "a+b", closefd=False) as fo:
+          fo.seek(src.offset)
+          fo.readinto(dest)
     else:
       dest[:] = src._buf()
 
@@ -95,6 +97,8 @@ class DiskDevice(Compiled):
       self.mem = mmap.mmap(self.fd, self.size)
     if hasattr(self.mem, 'madvise') and (hp := getattr(mmap, "MADV_HUGEPAGE", None)) is not None:
       with contextlib.suppress(OSError): self.mem.madvise(hp) # some systems have transparent_hugepage disabled
+    # NOTE: one view over the whole mapping, every DiskBuffer access slices it instead of wrapping the mmap again
+    self.mem_view = memoryview(self.mem)
   def _might_close(self):
     self.count -= 1
     if self.count == 0:
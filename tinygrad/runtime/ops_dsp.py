@@ -1,8 +1,8 @@
 from __future__ import annotations
-from typing import Tuple, Any
+from typing import Tuple, Any, Optional
 import ctypes, os, mmap, tempfile, pathlib, array, functools, threading, contextlib, sys
 assert sys.platform != 'win32'
-from tinygrad.device import BufferOptions, Compiled, Allocator
+from tinygrad.device import BufferOptions, Compiled, LRUAllocator
 from tinygrad.helpers import from_mv, getenv, round_up, mv_address, to_mv
 from tinygrad.runtime.ops_clang import ClangCompiler
 from tinygrad.renderer.cstyle import DSPRenderer
@@ -27,24 +27,34 @@ class DSPProgram:
   def __call__(self, *bufs, vals:Tuple[int, ...]=(), wait=False):
     if len(bufs) >= 16: raise RuntimeError(f"Too many buffers to execute: {len(bufs)}")
 
-    pra, fds, attrs, _ = rpc_prep_args(ins=[var_vals_mv:=memoryview(bytearray((len(bufs)+len(vals))*4)), off_mv:=memoryview(bytearray(len(bufs)*4))],
-                                       outs=[timer:=memoryview(bytearray(8)).cast('Q')], in_fds=[b.share_info.fd for b in bufs])
-    var_vals_mv.cast('i')[:] = array.array('i', tuple(b.size for b in bufs) + vals)
-    off_mv.cast('I')[:] = array.array('I', tuple(b.offset for b in bufs))
-    self.device.exec_lib(self.lib, rpc_sc(method=2, ins=2, outs=1, fds=len(bufs)), pra, fds, attrs)
-    return timer[0] / 1e6
+    # NOTE: a program is always launched with the same number of bufs and vals, so the arg buffers and rpc args are built once and refilled
+    if not hasattr(self, "var_vals_mv"):
+      self.var_vals_mv, self.off_mv = memoryview(bytearray((len(bufs)+len(vals))*4)).cast('i'), memoryview(bytearray(len(bufs)*4)).cast('I')
+      self.timer = memoryview(bytearray(8)).cast('Q')
+      self.pra, self.fds, self.attrs, (ins, outs) = rpc_prep_args(ins=[self.var_vals_mv, self.off_mv], outs=[self.timer],
+                                                                  in_fds=[b.share_info.fd for b in bufs])
+      # the buffer fds come after one (unused) fd slot per in and out arg
+      self.fd_base = len(ins) + len(outs)
+    else: self.fds[self.fd_base:] = [b.share_info.fd for b in bufs]
+    self.var_vals_mv[:] = array.array('i', tuple(b.size for b in bufs) + vals)
+    self.off_mv[:] = array.array('I', tuple(b.offset for b in bufs))
+    self.device.exec_lib(self.lib, rpc_sc(method=2, ins=2, outs=1, fds=len(bufs)), self.pra, self.fds, self.attrs)
+    return self.timer[0] / 1e6
 
 class DSPBuffer:
   def __init__(self, va_addr:int, size:int, share_info:Any, offset:int=0):
     self.va_addr, self.size, self.share_info, self.offset = va_addr, size, share_info, offset
 
-class DSPAllocator(Allocator):
+class DSPAllocator(LRUAllocator):
   def __init__(self, device:DSPDevice):
     self.device = device
     super().__init__()
 
   def _alloc(self, size:int, options:BufferOptions):
-    b = qcom_dsp.ION_IOC_ALLOC(self.device.ion_fd, len=size, align=0x200, heap_id_mask=1<<qcom_dsp.ION_SYSTEM_HEAP_ID, flags=qcom_dsp.ION_FLAG_CACHED)
+    # NOTE: MemoryError lets LRUAllocator free its cached buffers and retry
+    try: b = qcom_dsp.ION_IOC_ALLOC(self.device.ion_fd, len=size, align=0x200, heap_id_mask=1<<qcom_dsp.ION_SYSTEM_HEAP_ID,
+                                    flags=qcom_dsp.ION_FLAG_CACHED)
+    except OSError as e: raise MemoryError(f"ION alloc of {size} bytes failed") from e
     share_info = qcom_dsp.ION_IOC_SHARE(self.device.ion_fd, handle=b.handle)
     va_addr = libc.mmap(0, size, mmap.PROT_READ|mmap.PROT_WRITE, mmap.MAP_SHARED, share_info.fd, 0)
     return DSPBuffer(va_addr, size, share_info, offset=0)
@@ -78,6 +88,7 @@ class DSPDevice(Compiled):
     self.shell_buf = self.allocator.alloc(round_up(fastrpc_shell.nbytes, 0x1000), BufferOptions(nolru=True))
     ctypes.memmove(self.shell_buf.va_addr, mv_address(fastrpc_shell), fastrpc_shell.nbytes)
 
+    self.opened_lib: Optional[Tuple[bytes, int]] = None
     self.init_dsp()
     RPCListner(self).start()
 
@@ -96,9 +107,13 @@ class DSPDevice(Compiled):
 
   def exec_lib(self, lib, sc, args, fds, attrs):
     def _exec_lib():
-      handle = self.open_lib(lib)
-      qcom_dsp.FASTRPC_IOCTL_INVOKE_ATTRS(self.rpc_fd, fds=fds, attrs=attrs, inv=qcom_dsp.struct_fastrpc_ioctl_invoke(handle=handle, sc=sc, pra=args))
-      self.close_lib(handle)
+      # NOTE: every lib is opened through the same tinylib uri, so only one is kept open. relaunching it skips the open/close invokes
+      if self.opened_lib is None or self.opened_lib[0] is not lib:
+        if self.opened_lib is not None: self.close_lib(self.opened_lib[1])
+        self.opened_lib = None # a failed open must not leave the closed handle behind
+        self.opened_lib = (lib, self.open_lib(lib))
+      inv = qcom_dsp.struct_fastrpc_ioctl_invoke(handle=self.opened_lib[1], sc=sc, pra=args)
+      qcom_dsp.FASTRPC_IOCTL_INVOKE_ATTRS(self.rpc_fd, fds=fds, attrs=attrs, inv=inv)
     try: _exec_lib()
     except (OSError, PermissionError):
       # DSP might ask for a connection reset or just fail with operation not permitted, try to reset connection.
@@ -112,6 +127,7 @@ class DSPDevice(Compiled):
       os.close(self.rpc_fd) # pylint: disable=access-member-before-definition
 
     self.rpc_fd: int = os.open('/dev/adsprpc-smd', os.O_RDONLY | os.O_NONBLOCK)
+    self.opened_lib = None
     qcom_dsp.FASTRPC_IOCTL_GETINFO(self.rpc_fd, 3)
     qcom_dsp.FASTRPC_IOCTL_CONTROL(self.rpc_fd, req=0x3)
     qcom_dsp.FASTRPC_IOCTL_INIT(self.rpc_fd, flags=0x1, file=self.shell_buf.va_addr, filelen=self.shell_buf.size, filefd=self.shell_buf.share_info.fd)
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Tuple, Optional, List, cast
+from typing import Tuple, Optional, List, Dict, Any, cast
 import ctypes, functools, hashlib
 from tinygrad.runtime.autogen import opencl as cl
 from tinygrad.helpers import init_c_var, to_char_p_p, from_mv, OSX, DEBUG, getenv, mv_address
@@ -39,17 +39,30 @@ class CLProgram:
     check(binary_status.value)
     check(cl.clBuildProgram(self.program, 1, device.device_id, None, cl.clBuildProgram.argtypes[4](), None)) # NOTE: OSX requires this
     self.kernel = checked(cl.clCreateKernel(self.program, name.encode(), status := ctypes.c_int32()), status)
+    # NOTE: args stay set on the kernel between enqueues, this tracks them so only the ones that changed are set again
+    self.bound_args: Dict[int, Any] = {}
+    # the work sizes are written into these on every enqueue instead of building new c_size_t arrays
+    self.global_size, self.local_size = (ctypes.c_size_t * 3)(), (ctypes.c_size_t * 3)()
 
   def __del__(self):
     if hasattr(self, 'kernel'): check(cl.clReleaseKernel(self.kernel))
     if hasattr(self, 'program'): check(cl.clReleaseProgram(self.program))
 
   def __call__(self, *bufs:Tuple[ctypes._CData, BufferOptions], global_size:Tuple[int,int,int]=(1,1,1), local_size:Optional[Tuple[int,int,int]]=None, vals:Tuple[int, ...]=(), wait=False) -> Optional[float]:  # noqa: E501
-    for i,(b,_) in enumerate(bufs): cl.clSetKernelArg(self.kernel, i, ctypes.sizeof(b), ctypes.byref(b))
-    for i,v in enumerate(vals,start=len(bufs)): cl.clSetKernelArg(self.kernel, i, 4, ctypes.byref(ctypes.c_int32(v)))
+    for i,(b,_) in enumerate(bufs):
+      if self.bound_args.get(i) is not b:
+        cl.clSetKernelArg(self.kernel, i, ctypes.sizeof(b), ctypes.byref(b))
+        self.bound_args[i] = b
+    for i,v in enumerate(vals,start=len(bufs)):
+      if self.bound_args.get(i) != v:
+        cl.clSetKernelArg(self.kernel, i, 4, ctypes.byref(ctypes.c_int32(v)))
+        self.bound_args[i] = v
     if local_size is not None: global_size = cast(Tuple[int,int,int], tuple(int(g*l) for g,l in zip(global_size, local_size)))
+    self.global_size[:len(global_size)] = global_size  # type: ignore[call-overload]
+    if local_size: self.local_size[:len(local_size)] = local_size  # type: ignore[call-overload]
     event = cl.cl_event() if wait else None
-    check(cl.clEnqueueNDRangeKernel(self.device.queue, self.kernel, len(global_size), None, (ctypes.c_size_t * len(global_size))(*global_size), (ctypes.c_size_t * len(local_size))(*local_size) if local_size else None, 0, None, event))  # noqa: E501
+    check(cl.clEnqueueNDRangeKernel(self.device.queue, self.kernel, len(global_size), None, self.global_size,
+                                    self.local_size if local_size else None, 0, None, event))
     if wait:
       assert event is not None
       check(cl.clWaitForEvents(1, event))
@@ -78,12 +91,13 @@ class CLAllocator(LRUAllocator):
       check(cl.clEnqueueWriteBuffer(self.device.queue, dest[0], False, 0, len(src)*src.itemsize, from_mv(src), 0, None, None))
     self.device.pending_copyin.append(src)    # NOTE: these can't be freed until the GPU actually executes this command
   def copyout(self, dest:memoryview, src:Tuple[ctypes._CData, BufferOptions]):
+    # NOTE: a blocking read on the in-order queue returns once everything enqueued before it is done, so it replaces the clFinish
     if src[1].image is not None:
-      check(cl.clEnqueueReadImage(self.device.queue, src[0], False, (ctypes.c_size_t * 3)(0,0,0),
+      check(cl.clEnqueueReadImage(self.device.queue, src[0], True, (ctypes.c_size_t * 3)(0,0,0),
                                   (ctypes.c_size_t * 3)(src[1].image.shape[1],src[1].image.shape[0],1), 0, 0, from_mv(dest), 0, None, None))
     else:
-      check(cl.clEnqueueReadBuffer(self.device.queue, src[0], False, 0, len(dest)*dest.itemsize, from_mv(dest), 0, None, None))
-    self.device.synchronize()
+      check(cl.clEnqueueReadBuffer(self.device.queue, src[0], True, 0, len(dest)*dest.itemsize, from_mv(dest), 0, None, None))
+    self.device.pending_copyin.clear()
 
 class CLDevice(Compiled):
   device_ids = None                 # this is global and only initted once
@@ -1,5 +1,5 @@
 from __future__ import annotations
-import ctypes, functools
+import ctypes, functools, threading
 from typing import Tuple
 from tinygrad.helpers import init_c_var, from_mv, init_c_struct_t, getenv
 from tinygrad.device import Compiled, LRUAllocator, BufferOptions
@@ -8,13 +8,16 @@ from tinygrad.runtime.support.compiler_hip import AMDCompiler
 from tinygrad.renderer.cstyle import HIPRenderer
 if getenv("IOCTL"): import extra.hip_gpu_driver.hip_ioctl  # noqa: F401 # pylint: disable=unused-import
 
+# hipSetDevice state is per thread, so is the record of which device was set last
+_hip_tls = threading.local()
+
 def check(status):
   if status != 0: raise RuntimeError(f"HIP Error {status}, {ctypes.string_at(hip.hipGetErrorString(status)).decode()}")
 
 class HIPProgram:
   def __init__(self, device:HIPDevice, name:str, lib:bytes):
     self.device, self.name, self.lib = device, name, lib
-    check(hip.hipSetDevice(self.device.device_id))
+    self.device.set_device()
     self.module = init_c_var(hip.hipModule_t(), lambda x: check(hip.hipModuleLoadData(ctypes.byref(x), lib)))
     self.prg = init_c_var(hip.hipFunction_t(), lambda x: check(hip.hipModuleGetFunction(ctypes.byref(x), self.module, name.encode("utf-8"))))
 
@@ -22,7 +25,7 @@ class HIPProgram:
     if hasattr(self, 'module'): check(hip.hipModuleUnload(self.module))
 
   def __call__(self, *args, global_size:Tuple[int,int,int]=(1,1,1), local_size:Tuple[int,int,int]=(1,1,1), vals:Tuple[int, ...]=(), wait=False):
-    check(hip.hipSetDevice(self.device.device_id))
+    self.device.set_device()
     if not hasattr(self, "vargs"):
       self.c_args = init_c_struct_t(tuple([(f'f{i}', hip.hipDeviceptr_t) for i in range(len(args))] +
                                           [(f'v{i}', ctypes.c_int) for i in range(len(vals))]))(*args, *vals)
@@ -47,11 +50,11 @@ class HIPAllocator(LRUAllocator):
     self.device = device
     super().__init__()
   def _alloc(self, size:int, options:BufferOptions):
-    check(hip.hipSetDevice(self.device.device_id))
+    self.device.set_device()
     return init_c_var(hip.hipDeviceptr_t(), lambda x: check(hip.hipMalloc(ctypes.byref(x), size)))
   def _free(self, opaque, options:BufferOptions): check(hip.hipFree(opaque))
   def copyin(self, dest, src: memoryview):
-    check(hip.hipSetDevice(self.device.device_id))
+    self.device.set_device()
     check(hip.hipMemcpy(dest, from_mv(src), len(src), hip.hipMemcpyHostToDevice))
   def copyout(self, dest:memoryview, src):
     self.device.synchronize()
@@ -63,6 +66,10 @@ class HIPDevice(Compiled):
     self.arch = init_c_var(hip.hipDeviceProp_t(), lambda x: check(hip.hipGetDeviceProperties(x, self.device_id))).gcnArchName.decode()
     self.time_event_st, self.time_event_en = [init_c_var(hip.hipEvent_t(), lambda x: hip.hipEventCreate(ctypes.byref(x), 0)) for _ in range(2)]
     super().__init__(device, HIPAllocator(self), HIPRenderer(), AMDCompiler(self.arch), functools.partial(HIPProgram, self))
+  def set_device(self):
+    if getattr(_hip_tls, "dev", None) != self.device_id:
+      check(hip.hipSetDevice(self.device_id))
+      _hip_tls.dev = self.device_id
   def synchronize(self):
-    check(hip.hipSetDevice(self.device_id))
+    self.set_device()
     check(hip.hipDeviceSynchronize())
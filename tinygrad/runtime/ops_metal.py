@@ -1,6 +1,6 @@
 from __future__ import annotations
 import os, subprocess, pathlib, ctypes, tempfile, functools
-from typing import List, Any, Tuple, Optional, cast
+from typing import List, Any, Tuple, Optional, Dict, cast
 from tinygrad.helpers import prod, getenv, T
 from tinygrad.device import Compiled, Compiler, CompileError, LRUAllocator
 from tinygrad.renderer.cstyle import MetalRenderer
@@ -32,18 +32,26 @@ libobjc.sel_registerName.restype = objc_id
 libmetal.MTLCreateSystemDefaultDevice.restype = objc_instance
 libdispatch.dispatch_data_create.restype = objc_instance
 
+# one objc_msgSend reference per restype, so it isn't looked up and retyped on every message
+msg_senders: Dict[type, Any] = {}
+
 # Ignore mypy error reporting incompatible default, because typevar default only works on python 3.12
 def msg(ptr: objc_id, selector: str, /, *args: Any, restype: type[T] = objc_id) -> T: # type: ignore [assignment]
-  sender = libobjc["objc_msgSend"] # Using attribute access returns a new reference so setting restype is safe
-  sender.restype = restype
+  if (sender:=msg_senders.get(restype)) is None:
+    sender = msg_senders[restype] = libobjc["objc_msgSend"] # Using attribute access returns a new reference so setting restype is safe
+    sender.restype = restype
   return sender(ptr, sel(selector), *args)
 
 def to_ns_str(s: str): return msg(libobjc.objc_getClass(b"NSString"), "stringWithUTF8String:", s.encode(), restype=objc_instance)
 
-def to_struct(*t: int, _type: type = ctypes.c_ulong):
+# NOTE: the struct type only depends on the field count and type, so it's built once instead of a new class on every call
+@functools.lru_cache(None)
+def struct_t(n: int, _type: type):
   class Struct(ctypes.Structure): pass
-  Struct._fields_ = [(f"field{i}", _type) for i in range(len(t))]
-  return Struct(*t)
+  Struct._fields_ = [(f"field{i}", _type) for i in range(n)]
+  return Struct
+
+def to_struct(*t: int, _type: type = ctypes.c_ulong): return struct_t(len(t), _type)(*t)
 
 def wait_check(cbuf: Any):
   msg(cbuf, "waitUntilCompleted")
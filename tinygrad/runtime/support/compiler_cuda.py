@@ -1,5 +1,5 @@
-import subprocess, hashlib, tempfile, ctypes, ctypes.util, re, pathlib
-from typing import Callable
+import subprocess, hashlib, tempfile, ctypes, ctypes.util, re, pathlib, functools
+from typing import Callable, Tuple
 from tinygrad.helpers import to_char_p_p, colored, init_c_var, getenv
 import tinygrad.runtime.autogen.nvrtc as nvrtc
 from tinygrad.device import Compiler, CompileError
@@ -38,6 +38,10 @@ def cuda_disassemble(lib, arch):
     print(subprocess.check_output(['nvdisasm', fn]).decode('utf-8'))
   except Exception as e: print("Failed to generate SASS", str(e), "Make sure your PATH contains ptxas/nvdisasm binary of compatible version.")
 
+# NOTE: the options are fixed per compiler, so the char** is built once. it's cached here and not on the compiler, which gets pickled for BEAM
+@functools.lru_cache(None)
+def nvrtc_options(options:Tuple[str, ...]): return to_char_p_p([o.encode() for o in options])
+
 class CUDACompiler(Compiler):
   def __init__(self, arch:str, cache_key:str="cuda"):
     self.arch, self.compile_options = arch, [f'--gpu-architecture={arch}', "-I/usr/local/cuda/include", "-I/usr/include", "-I/opt/cuda/include/"]
@@ -46,7 +50,7 @@ class CUDACompiler(Compiler):
     super().__init__(f"compile_{cache_key}_{self.arch}")
   def _compile_program(self, src:str, nvrtc_get_content:Callable, nvrtc_get_size:Callable) -> bytes:
     nvrtc_check(nvrtc.nvrtcCreateProgram(ctypes.byref(prog := nvrtc.nvrtcProgram()), src.encode(), "<null>".encode(), 0, None, None))
-    nvrtc_check(nvrtc.nvrtcCompileProgram(prog, len(self.compile_options), to_char_p_p([o.encode() for o in self.compile_options])), prog)
+    nvrtc_check(nvrtc.nvrtcCompileProgram(prog, len(self.compile_options), nvrtc_options(tuple(self.compile_options))), prog)
     data = _get_bytes(prog, nvrtc_get_content, nvrtc_get_size, nvrtc_check)
     nvrtc_check(nvrtc.nvrtcDestroyProgram(ctypes.byref(prog)))
     return data